@@ -1,17 +1,37 @@
 import sys
 import json
+import mmap
 import re
 from pathlib import Path
 import os
 import unicodedata
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from sortedcontainers import SortedList
 
 # Fuzzy matcher opcional
 try:
-    from rapidfuzz import fuzz
+    from rapidfuzz import fuzz, process
+    import numpy as np
     HAS_FUZZ = True
 except:
     HAS_FUZZ = False
 
+# Serializador opcional (Rust, mucho más rápido que json para escribir)
+try:
+    import orjson
+    HAS_ORJSON = True
+except:
+    HAS_ORJSON = False
+
+# Aho-Corasick opcional (una sola pasada sobre el texto para el match exacto)
+try:
+    import ahocorasick
+    HAS_AHO = True
+except:
+    HAS_AHO = False
+
 def fuzzy_similarity(a, b):
     import difflib
     return difflib.SequenceMatcher(None, a, b).ratio() * 100
@@ -29,12 +49,16 @@ def load_categories():
 CATEGORIES = load_categories()
 
 # Normalización + lematización ligera
+# (funciones puras de un string: cacheadas para no repetir el mismo
+# trabajo sobre palabras/términos que se ven una y otra vez)
+@lru_cache(maxsize=None)
 def normalize_text_for_matching(text):
     text = unicodedata.normalize("NFKD", text)
     text = text.replace("’","'")
     text = "".join(c for c in text if not unicodedata.combining(c))
     return text.lower()
 
+@lru_cache(maxsize=None)
 def lightweight_lemma(word):
     w = word.lower()
     suf_list = ["ing","ed","es","s","ion","ation","ment","ability","ization"]
@@ -43,95 +67,311 @@ def lightweight_lemma(word):
             return w[:-len(suf)]
     return w
 
-# Limpieza básica de texto
+# Limpieza básica de texto: las sustituciones de caracteres van en una
+# sola tabla (una pasada a nivel C) y los dos re.sub en una alternación
+CLEAN_TABLE = str.maketrans({'\ufeff': None, '\u200b': None, '\xa0': ' ',
+                             '“': '"', '”': '"', '—': '-'})
+_WS_DASH = re.compile(r'\s*-\s*|\s+')
+
 def clean_text(text):
-    text = text.replace('\ufeff','').replace('\u200b','').replace('\xa0',' ')
-    text = unicodedata.normalize('NFKC', text)
-    text = text.replace('“','"').replace('”','"').replace('—','-')
-    text = re.sub(r'\s*-\s*','-', text)
-    text = re.sub(r'\s+', ' ', text)
+    text = unicodedata.normalize('NFKC', text.translate(CLEAN_TABLE))
+    text = _WS_DASH.sub(lambda m: '-' if '-' in m.group(0) else ' ', text)
     return text.strip()
 
-# Construcción de patrones flexibles
-def build_flexible_pattern(term):
-    words = term.split()
-    escaped_words = [re.escape(lightweight_lemma(w)) for w in words]
-    base_pattern = r'\s+'.join(escaped_words)
-    
-    # Para términos cortos, solo match exacto
-    if len(term) < 6:  
-        pattern = rf"(?<!\w)({base_pattern})(?!\w)"
-    else:
-        # Para términos largos, permitimos sufijos
-        pattern = rf"(?<!\w)({base_pattern})(?:s|es|ing|ed|ion|ation|ment|ability|ization)?(?!\w)"
-    
-    return re.compile(pattern, flags=re.IGNORECASE)
-
-# Precompilación de patrones
+# Términos por categoría, ordenados de más largo a más corto
 MIN_TERM_LEN = 2
-PRECOMPILED = {}
+CATEGORY_TERMS = {}
+CATEGORY_MIN_LEN = {}
 for category, terms in CATEGORIES.items():
     filtered_terms = [t for t in terms if len(t) >= MIN_TERM_LEN]
-    terms_sorted = sorted(filtered_terms, key=lambda x: len(x), reverse=True)
-    PRECOMPILED[category] = [(term, build_flexible_pattern(term)) for term in terms_sorted]
+    CATEGORY_TERMS[category] = sorted(filtered_terms, key=lambda x: len(x), reverse=True)
+    # longitud del término más corto: permite saltar la categoría entera
+    # cuando el texto es más corto que cualquiera de sus términos
+    CATEGORY_MIN_LEN[category] = len(CATEGORY_TERMS[category][-1]) if CATEGORY_TERMS[category] else 0
+
+# Términos que son un único token \w+: se resuelven con un lookup por
+# token durante la tokenización del chunk, sin pasar por el autómata ni
+# por la alternación (equivale al chequeo de límites (?<!\w)...(?!\w))
+_TOKEN_RE = re.compile(r"\w+")
+TOKEN_TERMS = {}
+for cat_rank, (category, term_list) in enumerate(CATEGORY_TERMS.items()):
+    for term_rank, term in enumerate(term_list):
+        key = term.lower()
+        if _TOKEN_RE.fullmatch(key):
+            TOKEN_TERMS.setdefault(key, []).append((term, category, cat_rank, term_rank))
+
+# Fallback regex para los términos multi-palabra: una sola alternación
+# compilada por categoría en vez de un patrón (y un finditer) por término.
+# La alternación es de literales en minúsculas y se aplica sobre el texto
+# ya minusculizado: sin IGNORECASE el motor usa sus atajos de búsqueda
+# literal y no hay riesgo de backtracking patológico
+CATEGORY_PATTERNS = {}
+TERM_BY_LOWER = {}
+if not HAS_AHO:
+    for cat_rank, (category, term_list) in enumerate(CATEGORY_TERMS.items()):
+        lower_map = {}
+        for term_rank, term in enumerate(term_list):
+            key = term.lower()
+            if _TOKEN_RE.fullmatch(key):
+                continue
+            lower_map.setdefault(key, (term, cat_rank, term_rank))
+        if not lower_map:
+            continue
+        TERM_BY_LOWER[category] = lower_map
+        alternation = "|".join(re.escape(term) for term in lower_map)
+        CATEGORY_PATTERNS[category] = re.compile(
+            rf"(?<!\w)(?:{alternation})(?!\w)")
+
+# El fuzzy se puede apagar por entorno (suele ser la fuente de falsos
+# positivos) y su peor caso queda acotado en el fallback puro-Python
+ENABLE_FUZZY = os.environ.get('ANNOTATE_FUZZY', '1') == '1'
+FUZZY_MAX_WORDS = int(os.environ.get('ANNOTATE_FUZZY_MAX_WORDS', '5000'))
+
+# Normalización y lema de cada término, calculados una sola vez al cargar
+# el módulo en vez de en cada llamada a annotate_text
+TERM_NORM = {}
+TERM_LEMMA = {}
+for term_list in CATEGORY_TERMS.values():
+    for term in term_list:
+        norm = normalize_text_for_matching(term)
+        TERM_NORM[term] = norm
+        TERM_LEMMA[term] = lightweight_lemma(norm)
+
+# Códigos numéricos de categoría para acumular anotaciones en columnas
+CAT_NAMES = list(CATEGORY_TERMS)
+CAT_CODE = {name: code for code, name in enumerate(CAT_NAMES)}
+
+MIN_FUZZY_LEN = 6  # longitud mínima de término para fuzzy match
+
+# Términos fuzzy agrupados por forma normalizada: un mismo target repetido
+# en varias categorías (o varias veces) se puntúa una sola vez por chunk
+FUZZY_GROUPS = {}
+for category, term_list in CATEGORY_TERMS.items():
+    for term in term_list:
+        if len(term) < MIN_FUZZY_LEN:
+            continue
+        norm = TERM_NORM[term]
+        if norm not in FUZZY_GROUPS:
+            FUZZY_GROUPS[norm] = (TERM_LEMMA[term], [])
+        FUZZY_GROUPS[norm][1].append((category, term))
+
+# Autómata Aho-Corasick solo para los términos multi-palabra (los de un
+# token se resuelven por lookup); se escanea el texto una única vez
+AUTOMATON = None
+if HAS_AHO:
+    AUTOMATON = ahocorasick.Automaton()
+    n_multi = 0
+    for cat_rank, (category, term_list) in enumerate(CATEGORY_TERMS.items()):
+        for term_rank, term in enumerate(term_list):
+            key = term.lower()
+            if _TOKEN_RE.fullmatch(key):
+                continue
+            payload = (term, category, cat_rank, term_rank)
+            if key in AUTOMATON:
+                AUTOMATON.get(key).append(payload)
+            else:
+                AUTOMATON.add_word(key, [payload])
+            n_multi += 1
+    if n_multi:
+        AUTOMATON.make_automaton()
+    else:
+        AUTOMATON = None
+
+def _is_word_char(c):
+    return c.isalnum() or c == "_"
+
+# Chequeo de solape + inserción sobre una SortedList de spans en una sola
+# operación: O(log K) por candidato en vez de recorrer todos los spans
+def _try_insert_span(used_spans, start, end):
+    i = used_spans.bisect_right((start,))
+    if i > 0 and used_spans[i - 1][1] > start:
+        return False
+    if i < len(used_spans) and used_spans[i][0] < end:
+        return False
+    used_spans.add((start, end))
+    return True
+
+# Equivalente a los límites (?<!\w)...(?!\w) del patrón original
+def _has_word_boundaries(text_lower, start, end):
+    if start > 0 and _is_word_char(text_lower[start-1]):
+        return False
+    if end < len(text_lower) and _is_word_char(text_lower[end]):
+        return False
+    return True
 
 # Función principal de anotación
 def annotate_text(text, debug=False):
-    annotations = []
-    used_spans = set()
-    MIN_FUZZY_LEN = 6  # mínimo para fuzzy match
+    # Anotaciones en columnas (starts/ends/códigos de categoría): más
+    # compacto que una lista de listas mientras se acumula
+    ann_starts, ann_ends, ann_cats = [], [], []
+    used_spans = SortedList()
 
-    words = re.findall(r"\b[\w\-]+\b", text)
-    words_unique = list(dict.fromkeys(words))
+    # Tokenización única: palabras únicas (sin distinguir mayúsculas) y la
+    # posición de su primera aparición, para no volver a escanear el texto
+    word_pos = {}
+    for m_tok in re.finditer(r"\b[\w\-]+\b", text):
+        word_pos.setdefault(m_tok.group(0).lower(), m_tok.start())
     if debug:
+        words_unique = list(word_pos)
         print(f"[DEBUG] Palabras únicas: {words_unique[:10]}... (+{len(words_unique)-10} si hay más)")
 
-    for category, term_list in PRECOMPILED.items():
+    # Candidatas para fuzzy, ya en minúsculas: forma normalizada y lema
+    # calculados una sola vez por palabra, fuera de los bucles por término
+    word_records = []
+    for wl in word_pos:
+        if len(wl) < MIN_FUZZY_LEN:
+            continue
+        wn = normalize_text_for_matching(wl)
+        word_records.append((wl, wn, lightweight_lemma(wn)))
+
+    # --- MATCH EXACTO ---
+    exact_matched = set()
+    text_lower = text.lower()
+    hits = []
+
+    # Términos de un solo token: lookup directo durante una pasada de
+    # tokenización (los límites de palabra salen gratis del tokenizador)
+    for m_tok in _TOKEN_RE.finditer(text_lower):
+        for term, category, cat_rank, term_rank in TOKEN_TERMS.get(m_tok.group(0), ()):
+            hits.append((cat_rank, term_rank, m_tok.start(), m_tok.end(), term, category))
+
+    # Términos multi-palabra: autómata Aho-Corasick, o la alternación por
+    # categoría si no hay pyahocorasick
+    if AUTOMATON is not None:
+        for end_idx, payloads in AUTOMATON.iter(text_lower):
+            start = end_idx - len(payloads[0][0]) + 1
+            if not _has_word_boundaries(text_lower, start, end_idx + 1):
+                continue
+            for term, category, cat_rank, term_rank in payloads:
+                hits.append((cat_rank, term_rank, start, end_idx + 1, term, category))
+    elif not HAS_AHO:
+        for category, big_pattern in CATEGORY_PATTERNS.items():
+            if CATEGORY_MIN_LEN[category] > len(text):
+                continue
+            for match in big_pattern.finditer(text_lower):
+                term, cat_rank, term_rank = TERM_BY_LOWER[category][match.group(0)]
+                hits.append((cat_rank, term_rank, match.start(), match.end(), term, category))
+
+    # misma prioridad que el recorrido original: categoría, luego términos largos
+    hits.sort()
+    for cat_rank, term_rank, start, end, term, category in hits:
+        if not _try_insert_span(used_spans, start, end):
+            continue
+        ann_starts.append(start); ann_ends.append(end)
+        ann_cats.append(CAT_CODE[category])
+        exact_matched.add((category, term))
         if debug:
-            print(f"[DEBUG] Procesando categoría: {category} ({len(term_list)} términos)")
-        for original_term, pattern in term_list:
-            matched_here = False
-
-            # --- MATCH EXACTO SOLO SI COINCIDE COMPLETO ---
-            for match in pattern.finditer(text):
-                span_range = (match.start(), match.end())
-                if any(s <= span_range[0] < e or s < span_range[1] <= e for s, e in used_spans):
+            print(f"[DEBUG] Match exacto: '{text[start:end]}' -> '{term}' ({category})")
+
+    # --- FUZZY MATCH solo para términos largos sin match exacto ---
+    # (términos más largos que el propio texto no pueden matchear nada);
+    # los targets con la misma forma normalizada se puntúan una sola vez
+    fuzzy_groups = []
+    if ENABLE_FUZZY:
+        for norm, (lemma_target, pairs) in FUZZY_GROUPS.items():
+            pending = [(c, t) for c, t in pairs
+                       if len(t) <= len(text) and (c, t) not in exact_matched]
+            if pending:
+                fuzzy_groups.append((norm, lemma_target, pending))
+
+    if HAS_FUZZ and word_records and fuzzy_groups:
+        # Una sola llamada en C++ puntúa todas las parejas (palabra, target)
+        norm_words = [wn for _w, wn, _l in word_records]
+        norm_targets = [norm for norm, _l, _p in fuzzy_groups]
+        scores = process.cdist(norm_words, norm_targets, scorer=fuzz.ratio,
+                               dtype=np.uint8, score_cutoff=88, workers=-1)
+        for j, (norm, lemma_target, pending) in enumerate(fuzzy_groups):
+            pair_idx = 0
+            for i in np.nonzero(scores[:, j])[0]:
+                if pair_idx >= len(pending):
+                    break
+                w, wn, w_lemma = word_records[i]
+                if w_lemma == lemma_target:
                     continue
-                matched_word = match.group(0)
-
-                # SOLO aceptamos si es exactamente igual (ignorando mayúsculas/minúsculas)
-                if matched_word.lower() == original_term.lower():
-                    annotations.append([match.start(), match.end(), category])
-                    used_spans.add(span_range)
-                    matched_here = True
-                    if debug:
-                        print(f"[DEBUG] Match exacto: '{matched_word}' -> '{original_term}' ({category})")
-
-            # --- FUZZY MATCH solo para términos largos ---
-            if not matched_here and len(original_term) >= MIN_FUZZY_LEN:
-                target = normalize_text_for_matching(original_term)
-                lemma_target = lightweight_lemma(target)
-                for w in words_unique:
-                    wn = normalize_text_for_matching(w)
-                    if len(w) < MIN_FUZZY_LEN:
-                        continue
-                    idx = text.lower().find(w.lower())
-                    span_range = (idx, idx+len(w))
-                    if any(s <= span_range[0] < e or s < span_range[1] <= e for s, e in used_spans):
-                        continue
-                    if lightweight_lemma(wn) == lemma_target:
+                idx = word_pos[w]
+                if not _try_insert_span(used_spans, idx, idx + len(w)):
+                    continue
+                category, original_term = pending[pair_idx]
+                pair_idx += 1
+                ann_starts.append(idx); ann_ends.append(idx + len(w))
+                ann_cats.append(CAT_CODE[category])
+                if debug:
+                    print(f"[DEBUG] Match fuzzy ({scores[i, j]}%): '{w}' -> '{original_term}' ({category})")
+    else:
+        # Fallback en Python puro (difflib) con buckets por longitud.
+        # Sin rapidfuzz el doble bucle es cuadrático: con demasiadas
+        # palabras se omite el fuzzy para acotar el peor caso
+        if len(word_records) > FUZZY_MAX_WORDS:
+            if debug:
+                print(f"[DEBUG] Fuzzy omitido: {len(word_records)} palabras > {FUZZY_MAX_WORDS}")
+            fuzzy_groups = []
+        words_by_len = defaultdict(list)
+        for w, wn, w_lemma in word_records:
+            words_by_len[len(wn)].append((w, wn, w_lemma))
+        for norm, lemma_target, pending in fuzzy_groups:
+            # sim >= 88 implica |len(wn) - L| <= 0.12*(len(wn) + L),
+            # así que solo miramos los buckets de longitud compatible
+            L = len(norm)
+            lo = int(L * 0.88 / 1.12)
+            hi = int(L * 1.12 / 0.88) + 1
+            pair_idx = 0
+            for wl in range(lo, hi + 1):
+                for w, wn, w_lemma in words_by_len.get(wl, ()):
+                    if pair_idx >= len(pending):
+                        break
+                    if w_lemma == lemma_target:
                         continue
-                    sim = fuzz.ratio(wn, target) if HAS_FUZZ else fuzzy_similarity(wn, target)
+                    sim = fuzzy_similarity(wn, norm)
                     if sim >= 88:
-                        annotations.append([idx, idx+len(w), category])
-                        used_spans.add(span_range)
+                        idx = word_pos[w]
+                        if not _try_insert_span(used_spans, idx, idx+len(w)):
+                            continue
+                        category, original_term = pending[pair_idx]
+                        pair_idx += 1
+                        ann_starts.append(idx); ann_ends.append(idx+len(w))
+                        ann_cats.append(CAT_CODE[category])
                         if debug:
                             print(f"[DEBUG] Match fuzzy ({sim:.1f}%): '{w}' -> '{original_term}' ({category})")
-                        break
+                if pair_idx >= len(pending):
+                    break
 
     if debug:
-        print(f"[DEBUG] Total anotaciones: {len(annotations)}")
-    return annotations
+        print(f"[DEBUG] Total anotaciones: {len(ann_starts)}")
+    # La estructura de doccano se materializa una sola vez, al final
+    return [[s, e, CAT_NAMES[c]] for s, e, c in zip(ann_starts, ann_ends, ann_cats)]
+
+# Serializa la línea completa a bytes antes de tocar el archivo
+# (orjson ya produce UTF-8 compacto, igual que ensure_ascii=False + separators)
+def _dump_chunk(json_line):
+    if HAS_ORJSON:
+        return orjson.dumps(json_line) + b"\n"
+    return (json.dumps(json_line, ensure_ascii=False, separators=(',',':'))+"\n").encode("utf-8")
+
+# --- Cuerpo de procesamiento de un chunk (leer -> limpiar -> anotar -> escribir) ---
+# Función a nivel de módulo para poder ejecutarla también en workers
+def _process_chunk(args):
+    file_path, output_file, chunk_str = args
+    # Lectura vía mmap: cero copias intermedias hasta el decode
+    with open(file_path,"rb") as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                text = mm[:].decode("utf-8")
+        except ValueError:  # archivo vacío
+            text = ""
+    text_clean = clean_text(text)
+    annotations = annotate_text(text_clean)
+    json_line = {"id": int(chunk_str), "text": text_clean, "label": annotations, "Comments":[]}
+    # Un único write binario por chunk, sin pasar por el wrapper de texto
+    with open(output_file,"wb") as out:
+        out.write(_dump_chunk(json_line))
+    return output_file, len(annotations)
+
+# Lista los chunks de un artículo con un solo scandir, ordenados por número
+def _scan_chunks(art_dir, art_num):
+    prefix = f"art{art_num}_chunk_"
+    entries = [e for e in os.scandir(art_dir)
+               if e.name.startswith(prefix) and e.name.endswith(".txt")]
+    return sorted(entries, key=lambda e: int(e.name[len(prefix):-4]))
 
 # --- Procesamiento de un solo archivo ---
 def process_single_file(possible_root):
@@ -141,18 +381,12 @@ def process_single_file(possible_root):
     if not input_file.exists():
         print(f"No se encontró el archivo: {input_file}")
         sys.exit(1)
-    with open(input_file,"r",encoding="utf-8") as f:
-        text = f.read()
-    text_clean = clean_text(text)
-    annotations = annotate_text(text_clean)
     output_folder = Path(__file__).parent / f"art{art_num}"
     os.makedirs(output_folder, exist_ok=True)
     output_file = output_folder / f"art{art_num}_chunk_{chunk_num}.jsonl"
-    json_line = {"id": int(chunk_num), "text": text_clean, "label": annotations, "Comments":[]}
-    with open(output_file,"w",encoding="utf-8") as out:
-        out.write(json.dumps(json_line, ensure_ascii=False, separators=(',',':'))+"\n")
+    output_file, n_annotations = _process_chunk((input_file, output_file, chunk_num))
     print(f"\nArchivo anotado generado: {output_file}")
-    print(f"Total de anotaciones detectadas: {len(annotations)}")
+    print(f"Total de anotaciones detectadas: {n_annotations}")
 
 # --- Procesamiento de todos los chunks de un artículo ---
 def process_folder(possible_root):
@@ -161,25 +395,19 @@ def process_folder(possible_root):
     if not input_dir.exists():
         print(f"No se encontró el directorio: {input_dir}")
         sys.exit(1)
-    all_chunks = sorted([f for f in input_dir.glob(f"art{art_num}_chunk_*.txt")])
+    all_chunks = _scan_chunks(input_dir, art_num)
     if not all_chunks:
         print("No se encontraron chunks.")
         sys.exit(1)
     output_folder = Path(__file__).parent/f"art{art_num}"
     os.makedirs(output_folder, exist_ok=True)
     total_annotations = 0
-    for file_path in all_chunks:
-        chunk_str = file_path.stem.split("_")[-1]
-        with open(file_path,"r",encoding="utf-8") as f:
-            text = f.read()
-        text_clean = clean_text(text)
-        annotations = annotate_text(text_clean)
-        total_annotations += len(annotations)
+    for entry in all_chunks:
+        chunk_str = entry.name[:-4].split("_")[-1]
         output_file = output_folder/f"art{art_num}_chunk_{chunk_str}.jsonl"
-        json_line = {"id": int(chunk_str), "text": text_clean, "label": annotations, "Comments":[]}
-        with open(output_file,"w",encoding="utf-8") as out:
-            out.write(json.dumps(json_line, ensure_ascii=False, separators=(',',':'))+"\n")
-        print(f"✓ Procesado: {output_file} ({len(annotations)} anotaciones)")
+        output_file, n_annotations = _process_chunk((entry.path, output_file, chunk_str))
+        total_annotations += n_annotations
+        print(f"✓ Procesado: {output_file} ({n_annotations} anotaciones)")
     print(f"\nTotal chunks: {len(all_chunks)}, Total anotaciones: {total_annotations}")
 
 # --- Procesamiento de todos los artículos ---
@@ -192,27 +420,48 @@ def process_all_articles(possible_root):
     if not art_dirs:
         print("No hay carpetas artXX.")
         sys.exit(1)
-    total_annotations_global = 0
-    total_chunks_global = 0
+    tasks = []
     for art_dir in art_dirs:
         art_num = art_dir.name.replace("art","")
         output_folder = Path(__file__).parent / f"art{art_num}"
         os.makedirs(output_folder, exist_ok=True)
-        chunks = sorted(art_dir.glob(f"art{art_num}_chunk_*.txt"))
-        for file_path in chunks:
-            chunk_str = file_path.stem.split("_")[-1]
-            with open(file_path,"r",encoding="utf-8") as f:
-                text = f.read()
-            text_clean = clean_text(text)
-            annotations = annotate_text(text_clean)
-            total_annotations_global += len(annotations)
-            total_chunks_global += 1
+        for entry in _scan_chunks(art_dir, art_num):
+            chunk_str = entry.name[:-4].split("_")[-1]
             output_file = output_folder/f"art{art_num}_chunk_{chunk_str}.jsonl"
-            json_line = {"id": int(chunk_str), "text": text_clean, "label": annotations, "Comments":[]}
-            with open(output_file,"w",encoding="utf-8") as out:
-                out.write(json.dumps(json_line, ensure_ascii=False, separators=(',',':'))+"\n")
-            print(f"✓ {output_file} ({len(annotations)} anotaciones)")
-    print(f"\nTotal artículos: {len(art_dirs)}, Chunks: {total_chunks_global}, Anotaciones: {total_annotations_global}")
+            tasks.append((entry.path, output_file, chunk_str))
+    total_annotations_global = 0
+    # Cada chunk es independiente: se reparten entre todos los núcleos
+    # (los workers heredan el diccionario y el autómata vía fork)
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+        for output_file, n_annotations in ex.map(_process_chunk, tasks, chunksize=8):
+            total_annotations_global += n_annotations
+            print(f"✓ {output_file} ({n_annotations} anotaciones)")
+    print(f"\nTotal artículos: {len(art_dirs)}, Chunks: {len(tasks)}, Anotaciones: {total_annotations_global}")
+
+# Localiza la carpeta raíz BioBERT-CMC- una sola vez y la cachea: primero
+# la variable de entorno, luego el dotfile, y solo al final el recorrido
+# de directorios padre (un stat por nivel)
+_ROOT_CACHE_FILE = Path(__file__).resolve().parent / ".biobert_root"
+
+def find_project_root():
+    env_root = os.environ.get("BIOBERT_ROOT")
+    if env_root and Path(env_root).exists():
+        return Path(env_root)
+    if _ROOT_CACHE_FILE.exists():
+        cached = Path(_ROOT_CACHE_FILE.read_text(encoding="utf-8").strip())
+        if cached.exists():
+            return cached
+    current_dir = Path(__file__).resolve().parent
+    for parent in [current_dir, *current_dir.parents]:
+        test_path = parent/"BioBERT-CMC-"
+        if test_path.exists():
+            os.environ["BIOBERT_ROOT"] = str(test_path)
+            try:
+                _ROOT_CACHE_FILE.write_text(str(test_path), encoding="utf-8")
+            except OSError:
+                pass
+            return test_path
+    return None
 
 # MAIN
 def main():
@@ -221,13 +470,7 @@ def main():
     print("2. Procesar todos los chunks de un artículo")
     print("3. Procesar TODOS los artículos y TODOS los chunks")
     choice = input("Opción (1/2/3): ").strip()
-    current_dir = Path(__file__).resolve().parent
-    possible_root = None
-    for parent in [current_dir, *current_dir.parents]:
-        test_path = parent/"BioBERT-CMC-"
-        if test_path.exists():
-            possible_root = test_path
-            break
+    possible_root = find_project_root()
     if not possible_root:
         print("No se encontró la carpeta raíz BioBERT-CMC-.")
         sys.exit(1)